@@ -1,8 +1,11 @@
 """Authentication module with JWT tokens and password hashing."""
 
 import os
+import time
+import base64
 import secrets
 import hashlib
+from functools import lru_cache
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -18,28 +21,49 @@ load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET", secrets.token_hex(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+# bcrypt work factor (2^cost rounds) — each decrement halves login CPU time
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", "10"))
+# Marks hashes of the base64 pre-hash; unmarked hashes use the legacy hex pre-hash
+PREHASH_PREFIX = "b64$"
 
 # Security scheme
 security = HTTPBearer()
 
 
 def _prepare_password(password: str) -> bytes:
-    """Pre-hash with SHA-256 to handle bcrypt's 72-byte limit safely."""
+    """Pre-hash with SHA-256 to handle bcrypt's 72-byte limit safely.
+
+    The raw digest is base64-encoded (44 bytes, no NULs) rather than hex-encoded.
+    """
+    return base64.b64encode(hashlib.sha256(password.encode("utf-8")).digest())
+
+
+def _prepare_password_legacy(password: str) -> bytes:
+    """Hex-encoded SHA-256 pre-hash used by accounts created before the base64 switch."""
     return hashlib.sha256(password.encode("utf-8")).hexdigest().encode("utf-8")
 
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
     pw = _prepare_password(password)
-    return bcrypt.hashpw(pw, bcrypt.gensalt()).decode("utf-8")
+    return PREHASH_PREFIX + bcrypt.hashpw(pw, bcrypt.gensalt(rounds=BCRYPT_COST)).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    pw = _prepare_password(plain_password)
+    """Verify a password against its hash (a single bcrypt check for either scheme)."""
+    if hashed_password.startswith(PREHASH_PREFIX):
+        pw = _prepare_password(plain_password)
+        hashed_password = hashed_password[len(PREHASH_PREFIX):]
+    else:
+        pw = _prepare_password_legacy(plain_password)
     return bcrypt.checkpw(pw, hashed_password.encode("utf-8"))
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored hash still uses the legacy hex pre-hash."""
+    return not hashed_password.startswith(PREHASH_PREFIX)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -48,6 +72,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+@lru_cache(maxsize=4096)
+def _verify_token(token: str) -> tuple[Optional[str], int]:
+    """Verify a JWT once and cache its (sub, exp) claims by raw token string."""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return payload.get("sub"), int(payload.get("exp", 0))
+
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
     """Dependency to extract the current user from the JWT token."""
     token = credentials.credentials
@@ -57,10 +88,10 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
+        username, expire = _verify_token(token)
     except JWTError:
         raise credentials_exception
+    # Cached entries outlive the token; re-check expiry on every hit
+    if username is None or expire <= time.time():
+        raise credentials_exception
+    return username
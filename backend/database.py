@@ -2,15 +2,35 @@
 
 import sqlite3
 import os
+import time
+import threading
 from datetime import datetime
+from typing import Optional
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "users.db")
 
+# Applied once when a thread opens its connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# One long-lived connection per thread  {thread: sqlite3.Connection}
+_local = threading.local()
+
 
 def get_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get this thread's database connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
     return conn
 
 
@@ -27,8 +47,14 @@ def init_db():
             created_at TEXT NOT NULL
         )
     """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS poster_cache (
+            title TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            fetched_at INTEGER NOT NULL
+        )
+    """)
     conn.commit()
-    conn.close()
     print("✅ Database initialized")
 
 
@@ -38,7 +64,6 @@ def get_user_by_username(username: str):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
     user = cursor.fetchone()
-    conn.close()
     return dict(user) if user else None
 
 
@@ -48,7 +73,6 @@ def get_user_by_email(email: str):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
-    conn.close()
     return dict(user) if user else None
 
 
@@ -64,6 +88,37 @@ def create_user(username: str, email: str, hashed_password: str):
         conn.commit()
         return True
     except sqlite3.IntegrityError:
+        conn.rollback()
         return False
-    finally:
-        conn.close()
+
+
+def update_password(username: str, hashed_password: str):
+    """Replace a user's stored password hash."""
+    conn = get_connection()
+    conn.execute(
+        "UPDATE users SET hashed_password = ? WHERE username = ?",
+        (hashed_password, username),
+    )
+    conn.commit()
+
+
+def get_cached_poster(title: str, max_age: int) -> Optional[str]:
+    """Fetch a cached poster URL if it is younger than max_age seconds."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT url FROM poster_cache WHERE title = ? AND fetched_at > ?",
+        (title, int(time.time()) - max_age),
+    )
+    row = cursor.fetchone()
+    return row["url"] if row else None
+
+
+def cache_poster(title: str, url: str):
+    """Store a poster URL (empty string when TMDB has none)."""
+    conn = get_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO poster_cache (title, url, fetched_at) VALUES (?, ?, ?)",
+        (title, url, int(time.time())),
+    )
+    conn.commit()
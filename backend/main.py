@@ -1,16 +1,22 @@
 """FastAPI main application — Movie Recommendation Web App."""
 
 import os
-import requests as http_requests
+from typing import List
+import httpx
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
-from backend.database import init_db, get_user_by_username, get_user_by_email, create_user
+from backend.database import (
+    init_db, get_user_by_username, get_user_by_email, create_user, update_password,
+)
 from backend.models import UserRegister, UserLogin, Token, MovieOut, RecommendationResponse
-from backend.auth import hash_password, verify_password, create_access_token, get_current_user
+from backend.auth import (
+    hash_password, verify_password, needs_rehash, create_access_token, get_current_user,
+)
 from backend import recommender
 
 
@@ -22,7 +28,8 @@ async def lifespan(app: FastAPI):
     yield
 
 
-app = FastAPI(title="🎬 Movie Recommender", lifespan=lifespan)
+app = FastAPI(title="🎬 Movie Recommender", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -37,6 +44,26 @@ app.add_middleware(
 FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
 
 
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip (honouring q=0 refusals)."""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
 # ─────────────────────────── Auth Routes ───────────────────────────
 
 @app.post("/api/register")
@@ -46,14 +73,15 @@ async def register(user: UserRegister):
         raise HTTPException(400, "Username must be at least 3 characters")
     if len(user.password) < 6:
         raise HTTPException(400, "Password must be at least 6 characters")
-    if get_user_by_username(user.username):
-        raise HTTPException(409, "Username already exists")
-    if get_user_by_email(user.email):
-        raise HTTPException(409, "Email already registered")
 
+    # The UNIQUE constraints are the authority; only look up which one hit on conflict
     hashed = hash_password(user.password)
     success = create_user(user.username, user.email, hashed)
     if not success:
+        if get_user_by_username(user.username):
+            raise HTTPException(409, "Username already exists")
+        if get_user_by_email(user.email):
+            raise HTTPException(409, "Email already registered")
         raise HTTPException(500, "Failed to create user")
 
     return {"message": "Account created successfully! Please log in."}
@@ -65,6 +93,9 @@ async def login(user: UserLogin):
     db_user = get_user_by_username(user.username)
     if not db_user or not verify_password(user.password, db_user["hashed_password"]):
         raise HTTPException(401, "Invalid username or password")
+    # Migrate legacy hex pre-hash accounts so the next login takes the fast path
+    if needs_rehash(db_user["hashed_password"]):
+        update_password(db_user["username"], hash_password(user.password))
 
     token = create_access_token(data={"sub": db_user["username"]})
     return Token(access_token=token, username=db_user["username"])
@@ -112,15 +143,32 @@ async def movie_poster(
     _user: str = Depends(get_current_user),
 ):
     """Get TMDB poster URL for a movie."""
-    url = recommender.get_poster_url(title)
-    return {"title": title, "poster_url": url}
+    posters = await recommender.get_poster_urls([title])
+    return {"title": title, "poster_url": posters[title]}
+
+
+@app.get("/api/movies/posters")
+async def movie_posters(
+    titles: List[str] = Query(...),
+    _user: str = Depends(get_current_user),
+):
+    """Get TMDB poster URLs for several movies in one request."""
+    if len(titles) > 50:
+        raise HTTPException(400, "At most 50 titles per request")
+    posters = await recommender.get_poster_urls(titles)
+    return {"posters": posters}
 
 
 @app.get("/api/movies/titles")
-async def all_titles(_user: str = Depends(get_current_user)):
+async def all_titles(request: Request, _user: str = Depends(get_current_user)):
     """Get all movie titles for autocomplete."""
-    titles = recommender.get_all_titles()
-    return {"titles": titles}
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        return Response(content=recommender.get_all_titles_json(compressed=True),
+                        media_type="application/json",
+                        headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return Response(content=recommender.get_all_titles_json(),
+                    media_type="application/json",
+                    headers={"Vary": "Accept-Encoding"})
 
 
 @app.get("/api/tmdb-key")
@@ -134,18 +182,30 @@ async def img_proxy(url: str = Query(...)):
     """Proxy TMDB images to bypass network blocks on image.tmdb.org."""
     if not url.startswith("https://image.tmdb.org/"):
         raise HTTPException(400, "Only TMDB image URLs are allowed")
+    client = httpx.AsyncClient(timeout=10, follow_redirects=True)
     try:
-        r = http_requests.get(url, timeout=10)
-        if r.status_code == 200:
-            content_type = r.headers.get("content-type", "image/jpeg")
-            return Response(content=r.content, media_type=content_type,
-                           headers={"Cache-Control": "public, max-age=86400"})
-        raise HTTPException(r.status_code, "Failed to fetch image")
-    except http_requests.exceptions.Timeout:
+        r = await client.send(client.build_request("GET", url), stream=True)
+    except httpx.TimeoutException:
+        await client.aclose()
         raise HTTPException(504, "Image fetch timed out")
     except Exception as e:
+        await client.aclose()
         raise HTTPException(502, str(e))
 
+    async def close():
+        await r.aclose()
+        await client.aclose()
+
+    if r.status_code != 200:
+        await close()
+        raise HTTPException(r.status_code, "Failed to fetch image")
+
+    # Stream bytes through as they arrive instead of buffering the whole image
+    content_type = r.headers.get("content-type", "image/jpeg")
+    return StreamingResponse(r.aiter_bytes(), media_type=content_type,
+                             headers={"Cache-Control": "public, max-age=86400"},
+                             background=BackgroundTask(close))
+
 
 # ─────────────────────────── Frontend Serving ──────────────────────
 
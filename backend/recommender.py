@@ -2,38 +2,152 @@
 
 import os
 import pickle
-import requests
+import gzip
+import bisect
+import asyncio
+import httpx
+import orjson
 import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import linear_kernel
+from scipy.sparse import csr_matrix
 from dotenv import load_dotenv
 
+from backend.database import get_cached_poster, cache_poster
+from backend.scoring import topk_cosine, quantize_int8
+
 load_dotenv()
 
 # Paths to data files (relative to project root)
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DF_PATH = os.path.join(BASE_DIR, "df.pkl")
+# Columnar copy of df.pkl, written on first load, holding only the columns used here
+DF_FEATHER_PATH = os.path.join(BASE_DIR, "df.feather")
+# Tag text the TF-IDF matrix is built from, stored under this name in DF_FEATHER_PATH
+TAG_COLUMN = "Tags"
 INDICES_PATH = os.path.join(BASE_DIR, "indices.pkl")
 TFIDF_PATH = os.path.join(BASE_DIR, "tfIDF.pkl")
+# Memory-mapped TF-IDF arrays, shared by all workers through the page cache
+TFIDF_CACHE_DIR = os.path.join(BASE_DIR, "tfidf_cache")
+TFIDF_CACHE_ARRAYS = (
+    "shape", "data", "indices", "indptr",
+    "T_data_q", "T_indices", "T_indptr", "row_scale",
+)
 
 TMDB_API_KEY = os.getenv("TMDB_API_KEY", "")
 TMDB_SEARCH_URL = "https://api.themoviedb.org/3/search/movie"
 TMDB_IMG_BASE = "https://image.tmdb.org/t/p/w500"
+POSTER_CACHE_TTL = 7 * 24 * 60 * 60  # 7 days
+
+# Columns serialized into each movie response
+MOVIE_COLUMNS = ["title", "overview", "genres", "tagline", "vote_average", "popularity"]
+
+# Leading trending pages cached until the next load_model; load_model builds them
+# for the default page size, other page sizes are cached on first request
+TRENDING_CACHE_PAGES = 5
 
 # Global state
 df = None
 indices = None
 tfidf_vectorizer = None
 tfidf_matrix = None
+tfidf_matrix_T = None  # int8-quantized; multiply row sums by _row_scale
+_row_scale = None
+_movie_columns = ()
+_popularity_order = None
+_indices_lower = None
+_title_blob = ""
+_title_offsets = []
+_titles_json = b""
+_titles_json_gz = b""
+
+# Exact title lookup  {lowercased title: row index}
+_title_to_idx = {}
+
+# Trending page cache  {(page, per_page): [movie, ...]}
+_trending_cache = {}
+
+
+def _ensure_feather():
+    """Convert df.pkl to DF_FEATHER_PATH when the Feather copy is missing or stale."""
+    if (os.path.exists(DF_FEATHER_PATH)
+            and os.path.getmtime(DF_FEATHER_PATH) >= os.path.getmtime(DF_PATH)):
+        return
+
+    with open(DF_PATH, "rb") as f:
+        frame = pickle.load(f)
+    # Use the 'Tags' column (or 'tags' as fallback)
+    tag_col = "Tags" if "Tags" in frame.columns else "tags"
+    frame = frame[MOVIE_COLUMNS + [tag_col]].rename(columns={tag_col: TAG_COLUMN})
+    frame = frame.reset_index(drop=True)
+    # Arrow needs a single type per column; popularity is pickled as mixed objects
+    frame["vote_average"] = pd.to_numeric(frame["vote_average"], errors="coerce")
+    frame["popularity"] = pd.to_numeric(frame["popularity"], errors="coerce")
+
+    tmp_path = f"{DF_FEATHER_PATH}.{os.getpid()}.tmp"
+    frame.to_feather(tmp_path)
+    os.replace(tmp_path, DF_FEATHER_PATH)
+
+
+def _load_movies() -> pd.DataFrame:
+    """Load only the response columns of the movie DataFrame."""
+    _ensure_feather()
+    return pd.read_feather(DF_FEATHER_PATH, columns=MOVIE_COLUMNS)
+
+
+def _load_tags() -> pd.Series:
+    """Load the tag text column, only needed when the TF-IDF cache is rebuilt."""
+    _ensure_feather()
+    return pd.read_feather(DF_FEATHER_PATH, columns=[TAG_COLUMN])[TAG_COLUMN].fillna("")
+
+
+def _build_tfidf_arrays(tags: pd.Series) -> dict:
+    """Vectorize the tags and return the CSR arrays persisted in TFIDF_CACHE_DIR."""
+    # float32 halves the bytes streamed per similarity query; ranking is unaffected
+    matrix = tfidf_vectorizer.transform(tags).tocsr().astype(np.float32)
+    # Rows are L2-normalized by the vectorizer, so cosine similarity is a plain dot product
+    matrix_T = matrix.T.tocsr()
+    # int8 postings + per-movie scale: a quarter of the bytes the kernel streams
+    data_q, row_scale = quantize_int8(matrix_T)
+    return {
+        "shape": np.array(matrix.shape, dtype=np.int64),
+        "data": matrix.data, "indices": matrix.indices, "indptr": matrix.indptr,
+        "T_data_q": data_q, "T_indices": matrix_T.indices, "T_indptr": matrix_T.indptr,
+        "row_scale": row_scale,
+    }
+
+
+def _load_tfidf_arrays() -> dict:
+    """Memory-map the cached TF-IDF arrays, rebuilding them if missing or stale."""
+    paths = {name: os.path.join(TFIDF_CACHE_DIR, name + ".npy") for name in TFIDF_CACHE_ARRAYS}
+    source_mtime = max(os.path.getmtime(DF_PATH), os.path.getmtime(TFIDF_PATH))
+    fresh = all(os.path.exists(p) and os.path.getmtime(p) >= source_mtime for p in paths.values())
+
+    if not fresh:
+        os.makedirs(TFIDF_CACHE_DIR, exist_ok=True)
+        for name, array in _build_tfidf_arrays(_load_tags()).items():
+            # Write then rename so concurrently starting workers never see a partial file
+            tmp_path = f"{paths[name]}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, paths[name])
+
+    return {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
 
 
 def load_model():
-    """Load all pickle files and precompute the TF-IDF matrix."""
-    global df, indices, tfidf_vectorizer, tfidf_matrix
+    """Load the movie data and TF-IDF matrix and precompute lookup structures.
+
+    The DataFrame is read from df.feather (converted from df.pkl when stale) and
+    the TF-IDF matrix is memory-mapped from tfidf_cache/; only indices.pkl and
+    tfIDF.pkl are unpickled.
+    """
+    global df, indices, tfidf_vectorizer, tfidf_matrix, tfidf_matrix_T, _popularity_order
+    global _row_scale, _movie_columns
+    global _indices_lower, _title_blob, _title_offsets
+    global _titles_json, _titles_json_gz
 
     print("⏳ Loading movie data...")
-    with open(DF_PATH, "rb") as f:
-        df = pickle.load(f)
+    df = _load_movies()
 
     with open(INDICES_PATH, "rb") as f:
         indices = pickle.load(f)
@@ -41,10 +155,18 @@ def load_model():
     with open(TFIDF_PATH, "rb") as f:
         tfidf_vectorizer = pickle.load(f)
 
-    # Build TF-IDF matrix from the 'Tags' column (or 'tags' as fallback)
-    tag_col = "Tags" if "Tags" in df.columns else "tags"
-    df[tag_col] = df[tag_col].fillna("")
-    tfidf_matrix = tfidf_vectorizer.transform(df[tag_col])
+    # TF-IDF matrix built from the tag column (or mapped from the on-disk cache)
+    arrays = _load_tfidf_arrays()
+    n_rows, n_terms = (int(x) for x in arrays["shape"])
+    tfidf_matrix = csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=(n_rows, n_terms), copy=False,
+    )
+    tfidf_matrix_T = csr_matrix(
+        (arrays["T_data_q"], arrays["T_indices"], arrays["T_indptr"]),
+        shape=(n_terms, n_rows), copy=False,
+    )
+    _row_scale = arrays["row_scale"]
 
     # Clean up NaN values for JSON serialization
     df["overview"] = df["overview"].fillna("")
@@ -54,119 +176,159 @@ def load_model():
     df["popularity"] = pd.to_numeric(df["popularity"], errors="coerce").fillna(0.0)
     df["title"] = df["title"].fillna("")
 
-    print(f"✅ Loaded {len(df)} movies, TF-IDF matrix shape: {tfidf_matrix.shape}")
+    # Column arrays in MOVIE_COLUMNS order, for building responses by row position
+    _movie_columns = tuple(df[col].to_numpy() for col in MOVIE_COLUMNS)
+
+    # Lowercase titles once instead of on every search/lookup
+    df["_title_lower"] = df["title"].str.lower()
+    _indices_lower = pd.Series(indices.index.str.lower(), index=indices.index)
+    _title_to_idx.clear()
+    for title_lower, idx in zip(_indices_lower, indices):
+        if isinstance(title_lower, str):
+            _title_to_idx.setdefault(title_lower, idx)
+
+    # Substring index: all titles joined into one newline-separated string,
+    # with the start offset of each row, so a search is a C-level str.find scan
+    titles_lower = [t.replace("\n", " ") for t in df["_title_lower"]]
+    _title_blob = "\n".join(titles_lower)
+    _title_offsets = []
+    offset = 0
+    for t in titles_lower:
+        _title_offsets.append(offset)
+        offset += len(t) + 1
+
+    # The autocomplete list never changes between loads; serialize it once
+    titles = df["title"].dropna().unique().tolist()
+    _titles_json = orjson.dumps({"titles": titles})
+    _titles_json_gz = gzip.compress(_titles_json)
+
+    # Popularity is static per load, so sort the catalog once
+    _popularity_order = np.argsort(-df["popularity"].to_numpy(), kind="stable")
+    _trending_cache.clear()
+    for page in range(1, TRENDING_CACHE_PAGES + 1):
+        get_trending(page=page)
+
+    # Compile the scoring kernel now rather than inside the first recommend request
+    query = tfidf_matrix[0]
+    topk_cosine(
+        query.indices, query.data,
+        tfidf_matrix_T.indptr, tfidf_matrix_T.indices, tfidf_matrix_T.data, _row_scale,
+        tfidf_matrix.shape[0], 0, 1,
+    )
 
-
-# Poster URL cache  {title: poster_url}
-_poster_cache = {}
+    print(f"✅ Loaded {len(df)} movies, TF-IDF matrix shape: {tfidf_matrix.shape}")
 
 
-def _fetch_poster_path(title: str) -> str:
-    """Fetch poster path from TMDB (cached)."""
-    if title in _poster_cache:
-        return _poster_cache[title]
+async def _fetch_poster_path_async(title: str, client: httpx.AsyncClient) -> str:
+    """Fetch poster path from TMDB without blocking the event loop (cached)."""
+    cached = get_cached_poster(title, POSTER_CACHE_TTL)
+    if cached is not None:
+        return cached
     if not TMDB_API_KEY:
         return ""
     try:
-        resp = requests.get(
+        resp = await client.get(
             TMDB_SEARCH_URL,
             params={"api_key": TMDB_API_KEY, "query": title},
-            timeout=8,
         )
         if resp.status_code == 200:
             data = resp.json()
             results = data.get("results", [])
+            url = ""
             if results and results[0].get("poster_path"):
                 url = TMDB_IMG_BASE + results[0]["poster_path"]
-                _poster_cache[title] = url
-                return url
+            cache_poster(title, url)
+            return url
     except Exception:
         pass
-    _poster_cache[title] = ""
     return ""
 
 
-def _build_movie(row) -> dict:
-    """Build a movie dict from a DataFrame row."""
-    title = str(row.get("title", ""))
+def _build_movie(title, overview, genres, tagline, vote_average, popularity) -> dict:
+    """Build a movie dict from one row's column values."""
     return {
-        "title": title,
-        "overview": str(row.get("overview", ""))[:200],
-        "genres": str(row.get("genres", "")),
-        "tagline": str(row.get("tagline", "")),
-        "vote_average": float(row.get("vote_average", 0)),
-        "popularity": float(row.get("popularity", 0)),
+        "title": str(title),
+        "overview": str(overview)[:200],
+        "genres": str(genres),
+        "tagline": str(tagline),
+        "vote_average": float(vote_average),
+        "popularity": float(popularity),
         "poster_url": None,
     }
 
 
+def _build_movies(positions) -> list:
+    """Build movie dicts for the given row positions of df."""
+    positions = np.asarray(positions, dtype=np.intp)
+    columns = [col[positions].tolist() for col in _movie_columns]
+    return [_build_movie(*values) for values in zip(*columns)]
+
+
 def get_recommendations(title: str, n: int = 12):
     """Get top-n movie recommendations for a given title using cosine similarity."""
     # Try exact match first
     title_lower = title.lower().strip()
-    matches = indices[indices.index.str.lower() == title_lower]
+    idx = _title_to_idx.get(title_lower)
 
-    if matches.empty:
+    if idx is None:
         # Try partial match
-        matches = indices[indices.index.str.lower().str.contains(title_lower, na=False)]
+        mask = _indices_lower.str.contains(title_lower, regex=False, na=False).to_numpy()
+        matches = indices[mask]
         if matches.empty:
             return []
+        idx = matches.iloc[0]
 
-    idx = matches.iloc[0]
-
-    # Compute cosine similarity between this movie and all others
-    cosine_sim = linear_kernel(tfidf_matrix[idx:idx+1], tfidf_matrix).flatten()
+    # Fused scoring + top-n selection in one compiled pass
+    query = tfidf_matrix[idx]
+    movie_indices = topk_cosine(
+        query.indices, query.data,
+        tfidf_matrix_T.indptr, tfidf_matrix_T.indices, tfidf_matrix_T.data, _row_scale,
+        tfidf_matrix.shape[0], idx, n,
+    ).tolist()
 
-    # Get top similar movies (exclude itself)
-    sim_scores = list(enumerate(cosine_sim))
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-    sim_scores = sim_scores[1:n+1]  # skip first (itself)
-
-    movie_indices = [i[0] for i in sim_scores]
-    results = df.iloc[movie_indices]
-
-    return [_build_movie(row) for _, row in results.iterrows()]
+    return _build_movies(movie_indices)
 
 
 def get_trending(page: int = 1, per_page: int = 20):
     """Get trending/popular movies."""
-    sorted_df = df.sort_values("popularity", ascending=False)
+    key = (page, per_page)
+    if key in _trending_cache:
+        return _trending_cache[key]
+
     start = (page - 1) * per_page
     end = start + per_page
-    subset = sorted_df.iloc[start:end]
-
-    return [_build_movie(row) for _, row in subset.iterrows()]
+    movies = _build_movies(_popularity_order[start:end])
+    if page <= TRENDING_CACHE_PAGES:
+        _trending_cache[key] = movies
+    return movies
 
 
 def search_movies(query: str, limit: int = 20):
     """Search movies by title."""
     query_lower = query.lower().strip()
-    mask = df["title"].str.lower().str.contains(query_lower, na=False)
-    results = df[mask].head(limit)
-
-    return [_build_movie(row) for _, row in results.iterrows()]
-
-
-def get_poster_url(title: str) -> str:
-    """Fetch movie poster URL from TMDB API."""
-    if not TMDB_API_KEY:
-        return ""
-    try:
-        resp = requests.get(
-            TMDB_SEARCH_URL,
-            params={"api_key": TMDB_API_KEY, "query": title},
-            timeout=5,
-        )
-        if resp.status_code == 200:
-            data = resp.json()
-            results = data.get("results", [])
-            if results and results[0].get("poster_path"):
-                return TMDB_IMG_BASE + results[0]["poster_path"]
-    except Exception:
-        pass
-    return ""
-
-
-def get_all_titles(limit: int = 50000):
-    """Return all movie titles for autocomplete."""
-    return df["title"].dropna().unique().tolist()[:limit]
+    if "\n" in query_lower:
+        return []
+
+    rows = []
+    pos = _title_blob.find(query_lower)
+    while pos != -1 and len(rows) < limit:
+        row = bisect.bisect_right(_title_offsets, pos) - 1
+        rows.append(row)
+        if row + 1 >= len(_title_offsets):
+            break
+        # Resume at the next title so each row is reported once
+        pos = _title_blob.find(query_lower, _title_offsets[row + 1])
+    return _build_movies(rows)
+
+
+async def get_poster_urls(titles: list) -> dict:
+    """Fetch TMDB poster URLs for many titles concurrently."""
+    titles = list(dict.fromkeys(titles))
+    async with httpx.AsyncClient(http2=True, timeout=8) as client:
+        urls = await asyncio.gather(*[_fetch_poster_path_async(t, client) for t in titles])
+    return dict(zip(titles, urls))
+
+
+def get_all_titles_json(compressed: bool = False) -> bytes:
+    """Return the pre-serialized {"titles": [...]} body, optionally gzipped."""
+    return _titles_json_gz if compressed else _titles_json
@@ -0,0 +1,60 @@
+"""Fused top-k cosine scoring kernel, compiled with Numba."""
+
+import numpy as np
+from numba import njit
+
+
+def _topk_cosine(q_indices, q_data, t_indptr, t_indices, t_data, row_scale, n_rows, skip, k):
+    """Score one query row against every row and return the top-k row ids.
+
+    Walks the posting lists of the query's terms in the transposed CSR matrix,
+    accumulating dot products, then selects the best k in a single pass over
+    the scores (excluding row `skip`), sorted by descending similarity.
+    `t_data` may be int8-quantized; each row's sum is rescaled by `row_scale`.
+    """
+    scores = np.zeros(n_rows, dtype=np.float32)
+    for j in range(q_indices.shape[0]):
+        term = q_indices[j]
+        weight = q_data[j]
+        for p in range(t_indptr[term], t_indptr[term + 1]):
+            scores[t_indices[p]] += weight * t_data[p]
+    for row in range(n_rows):
+        scores[row] *= row_scale[row]
+
+    k = min(k, n_rows - 1)
+    top_idx = np.empty(k, dtype=np.int64)
+    top_val = np.empty(k, dtype=np.float32)
+    filled = 0
+    for row in range(n_rows):
+        if row == skip:
+            continue
+        score = scores[row]
+        if filled == k and score <= top_val[k - 1]:
+            continue
+        # Insertion into the small descending-ordered top-k buffer
+        pos = filled if filled < k else k - 1
+        while pos > 0 and top_val[pos - 1] < score:
+            top_val[pos] = top_val[pos - 1]
+            top_idx[pos] = top_idx[pos - 1]
+            pos -= 1
+        top_val[pos] = score
+        top_idx[pos] = row
+        if filled < k:
+            filled += 1
+    return top_idx[:filled]
+
+
+def quantize_int8(matrix_T):
+    """Quantize a transposed CSR matrix's values to int8 with one scale per original row.
+
+    Returns (data_q, row_scale) where data_q[p] * row_scale[row] ~= matrix_T.data[p].
+    """
+    n_rows = matrix_T.shape[1]
+    row_max = np.zeros(n_rows, dtype=np.float32)
+    np.maximum.at(row_max, matrix_T.indices, matrix_T.data)
+    row_scale = np.where(row_max > 0, row_max / 127, 1).astype(np.float32)
+    data_q = np.rint(matrix_T.data / row_scale[matrix_T.indices])
+    return np.clip(data_q, -127, 127).astype(np.int8), row_scale
+
+
+topk_cosine = njit(cache=True, nogil=True)(_topk_cosine)